@@ -1,15 +1,44 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation, PillowWriter, FFMpegWriter
-from matplotlib.patches import Circle
 import seaborn as sns
+from numba import njit, prange
+from joblib import Parallel, delayed
 import os
-import json
+import orjson
 
 # Configuración de estilo
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (15, 6)
 
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _count_infected_contacts(positions, states, cell_x, cell_y, order, cell_start, ncell, r2, contacts):
+    """Cuenta, para cada susceptible, los infectados a distancia < r
+    recorriendo su vecindario 3x3 de celdas (compilado con Numba)."""
+    n = positions.shape[0]
+    for i in prange(n):
+        c = 0
+        if states[i] == 0:
+            for ox in range(-1, 2):
+                nx = cell_x[i] + ox
+                if nx < 0 or nx >= ncell:
+                    continue
+                for oy in range(-1, 2):
+                    ny = cell_y[i] + oy
+                    if ny < 0 or ny >= ncell:
+                        continue
+                    cid = nx * ncell + ny
+                    for k in range(cell_start[cid], cell_start[cid + 1]):
+                        j = order[k]
+                        if states[j] == 1:
+                            dx = positions[i, 0] - positions[j, 0]
+                            dy = positions[i, 1] - positions[j, 1]
+                            if dx * dx + dy * dy < r2:
+                                c += 1
+        contacts[i] = c
+
+
 class SIRParticleSimulation:
     """
     Simulación del modelo SIR mediante sistema de partículas.
@@ -20,7 +49,7 @@ class SIRParticleSimulation:
     2 - Recuperado (R)
     """
     
-    def __init__(self, L=10, Ntotal=200, I0=5, vmax=0.5, r=0.3, beta=0.5, gamma=0.1, dt=0.1):
+    def __init__(self, L=10, Ntotal=200, I0=5, vmax=0.5, r=0.3, beta=0.5, gamma=0.1, dt=0.1, seed=None):
         """
         Parámetros:
         -----------
@@ -40,6 +69,8 @@ class SIRParticleSimulation:
             Tasa de recuperación
         dt : float
             Delta de tiempo para la simulación
+        seed : int, opcional
+            Semilla del generador de números aleatorios (PCG64)
         """
         self.L = L
         self.Ntotal = Ntotal
@@ -49,31 +80,52 @@ class SIRParticleSimulation:
         self.beta = beta
         self.gamma = gamma
         self.dt = dt
+        self._pct = 100.0 / Ntotal
+        # Generador moderno (PCG64): mayor rendimiento que el legado np.random
+        self.rng = np.random.default_rng(seed)
         
         # Inicializar posiciones aleatorias
-        self.positions = np.random.uniform(0, L, (Ntotal, 2))
+        self.positions = self.rng.uniform(0, L, (Ntotal, 2)).astype(np.float32)
         
         # Inicializar velocidades aleatorias
-        angles = np.random.uniform(0, 2*np.pi, Ntotal)
-        speeds = np.random.uniform(0.5*vmax, vmax, Ntotal)
+        angles = self.rng.uniform(0, 2*np.pi, Ntotal)
+        speeds = self.rng.uniform(0.5*vmax, vmax, Ntotal)
         self.velocities = np.column_stack([speeds * np.cos(angles), 
-                                           speeds * np.sin(angles)])
+                                           speeds * np.sin(angles)]).astype(np.float32)
         
         # Inicializar estados (0: S, 1: I, 2: R)
-        self.states = np.zeros(Ntotal, dtype=int)
+        self.states = np.zeros(Ntotal, dtype=np.uint8)
         # Seleccionar infectados iniciales aleatoriamente
-        infected_indices = np.random.choice(Ntotal, I0, replace=False)
+        infected_indices = self.rng.choice(Ntotal, I0, replace=False)
         self.states[infected_indices] = 1
         
         # Tiempo de infección (para controlar la recuperación)
-        self.infection_time = np.zeros(Ntotal)
+        self.infection_time = np.zeros(Ntotal, dtype=np.float32)
         self.infection_time[infected_indices] = 0
+
+        # Tabla RGBA fija indexada por estado (azul=S, rojo=I, verde=R)
+        self.color_lut = np.array([
+            [0.0, 0.0, 1.0, 0.7],
+            [1.0, 0.0, 0.0, 0.7],
+            [0.0, 1.0, 0.0, 0.7],
+        ])
+        # Colores RGBA cacheados; solo se reescriben los índices que cambian
+        self.rgba = self.color_lut[self.states].copy()
+
+        # Conjuntos de índices S/I mantenidos incrementalmente (ordenados)
+        self.susceptible_idx = np.where(self.states == 0)[0]
+        self.infected_idx = np.where(self.states == 1)[0]
+
+        # Rejilla uniforme para la lista de celdas enlazadas (celdas de lado r)
+        self.ncell = int(np.ceil(L / r))
+        self._r2 = np.float32(r * r)
+        self._contacts = np.zeros(Ntotal, dtype=np.int32)
         
-        # Historial para gráficas
-        self.time_history = [0]
-        self.S_history = [np.sum(self.states == 0)]
-        self.I_history = [np.sum(self.states == 1)]
-        self.R_history = [np.sum(self.states == 2)]
+        # Historial para gráficas (ndarray preasignado; crece por duplicación)
+        self.hist = np.zeros((1024, 3), dtype=np.int32)
+        self.t_hist = np.zeros(1024)
+        self.hist[0] = np.bincount(self.states, minlength=3)
+        self.step_idx = 1
         
         self.current_time = 0
         
@@ -82,59 +134,172 @@ class SIRParticleSimulation:
         # Actualizar posiciones
         self.positions += self.velocities * self.dt
         
-        # Aplicar condiciones de frontera (rebote en paredes)
-        for i in range(self.Ntotal):
-            for dim in range(2):
-                if self.positions[i, dim] < 0:
-                    self.positions[i, dim] = 0
-                    self.velocities[i, dim] *= -1
-                elif self.positions[i, dim] > self.L:
-                    self.positions[i, dim] = self.L
-                    self.velocities[i, dim] *= -1
-        
-        # Detectar colisiones y contagios
-        susceptible_mask = self.states == 0
-        infected_mask = self.states == 1
-        
-        susceptible_indices = np.where(susceptible_mask)[0]
-        infected_indices = np.where(infected_mask)[0]
-        
-        # Verificar contagios
-        for s_idx in susceptible_indices:
-            for i_idx in infected_indices:
-                distance = np.linalg.norm(self.positions[s_idx] - self.positions[i_idx])
-                if distance < self.r:
-                    # Probabilidad de contagio
-                    if np.random.random() < self.beta * self.dt:
-                        self.states[s_idx] = 1
-                        self.infection_time[s_idx] = self.current_time
-                        break
-        
-        # Actualizar recuperaciones
-        for i_idx in infected_indices:
-            time_infected = self.current_time - self.infection_time[i_idx]
-            # Probabilidad de recuperación
-            if np.random.random() < self.gamma * self.dt:
-                self.states[i_idx] = 2
+        # Aplicar condiciones de frontera (rebote en paredes), vectorizado
+        below = self.positions < 0.0
+        above = self.positions > self.L
+        np.clip(self.positions, 0.0, self.L, out=self.positions)
+        self.velocities[below | above] *= -1
+        
+        # Detectar colisiones y contagios sobre los conjuntos de índices
+        # mantenidos incrementalmente (sin recalcular np.where por paso)
+        susceptible_indices = self.susceptible_idx
+        infected_indices = self.infected_idx
+        
+        # Verificar contagios solo si quedan ambos conjuntos: en la cola de la
+        # simulación (I -> 0 o S -> 0) todo el bloque es trabajo inútil
+        if susceptible_indices.size == 0 or infected_indices.size == 0:
+            newly_infected = susceptible_indices[:0]
+        else:
+            # Lista de celdas enlazadas: cada partícula se asigna a una celda
+            # de lado r y solo se prueban pares S-I dentro de la misma celda o
+            # de las 8 vecinas (O(N*k) en vez de O(N^2))
+            ncell = self.ncell
+            cell_x = np.minimum((self.positions[:, 0] / self.r).astype(np.int32), ncell - 1)
+            cell_y = np.minimum((self.positions[:, 1] / self.r).astype(np.int32), ncell - 1)
+            cell_id = cell_x * ncell + cell_y
+            order = np.argsort(cell_id)
+            cell_start = np.searchsorted(cell_id[order], np.arange(ncell * ncell + 1))
+
+            p_contagio = self.beta * self.dt
+            _count_infected_contacts(self.positions, self.states, cell_x, cell_y,
+                                     order, cell_start, ncell, self._r2, self._contacts)
+            # Con k contactos, P(contagio) = 1 - (1 - beta*dt)^k: un solo
+            # sorteo por susceptible equivale a un Bernoulli por par en contacto
+            k_contactos = self._contacts[susceptible_indices]
+            prob = 1.0 - (1.0 - p_contagio) ** k_contactos
+            hit = self.rng.random(susceptible_indices.size) < prob
+            newly_infected = susceptible_indices[hit]
+            self.states[newly_infected] = 1
+            self.infection_time[newly_infected] = self.current_time
+        
+        # Actualizar recuperaciones: un solo sorteo Bernoulli vectorizado sobre
+        # los infectados previos al contagio (los contagiados en este paso no
+        # pueden recuperarse en el mismo paso, igual que antes)
+        rec = self.rng.random(infected_indices.size) < self.gamma * self.dt
+        newly_recovered = infected_indices[rec]
+        self.states[newly_recovered] = 2
+        
+        # Aplicar las transiciones de este paso a los conjuntos de índices
+        self.susceptible_idx = np.setdiff1d(self.susceptible_idx, newly_infected,
+                                            assume_unique=True)
+        self.infected_idx = np.setdiff1d(np.union1d(self.infected_idx, newly_infected),
+                                         newly_recovered, assume_unique=True)
         
         # Actualizar tiempo
         self.current_time += self.dt
         
-        # Guardar historial
-        self.time_history.append(self.current_time)
-        self.S_history.append(np.sum(self.states == 0))
-        self.I_history.append(np.sum(self.states == 1))
-        self.R_history.append(np.sum(self.states == 2))
+        # Guardar historial (una sola pasada sobre states con bincount)
+        if self.step_idx >= self.t_hist.shape[0]:
+            self.hist = np.concatenate([self.hist, np.zeros_like(self.hist)])
+            self.t_hist = np.concatenate([self.t_hist, np.zeros_like(self.t_hist)])
+        self.hist[self.step_idx] = np.bincount(self.states, minlength=3)
+        self.t_hist[self.step_idx] = self.current_time
+        self.step_idx += 1
+        
+        return newly_infected, newly_recovered
+    
+
+    def run_headless(self, T_max=100):
+        """
+        Ejecuta la simulación sin animación (solo la física).
+        
+        Parámetros:
+        -----------
+        T_max : float
+            Tiempo máximo de simulación
+        """
+        num_steps = int(T_max / self.dt)
+        for _ in range(num_steps):
+            self.update()
+        return self.hist[:self.step_idx]
+    
+    @property
+    def time_history(self):
+        """Vista del historial de tiempos (compatibilidad con el graficado)."""
+        return self.t_hist[:self.step_idx]
+    
+    @property
+    def S_history(self):
+        return self.hist[:self.step_idx, 0]
+    
+    @property
+    def I_history(self):
+        return self.hist[:self.step_idx, 1]
+    
+    @property
+    def R_history(self):
+        return self.hist[:self.step_idx, 2]
     
     def get_colors(self):
-        """Retorna colores según el estado de cada partícula."""
-        colors = np.empty(self.Ntotal, dtype=object)
-        colors[self.states == 0] = 'blue'      # Susceptible
-        colors[self.states == 1] = 'red'       # Infectado
-        colors[self.states == 2] = 'green'     # Recuperado
-        return colors
+        """Retorna colores RGBA según el estado de cada partícula."""
+        return self.color_lut[self.states]
+    
+    _STATS_TEMPLATE = ('Tiempo: {t:.1f}\n'
+                       'S: {s} ({sp:.1f}%)\n'
+                       'I: {i} ({ip:.1f}%)\n'
+                       'R: {r} ({rp:.1f}%)')
+    
+    def _format_stats(self):
+        """Formatea el texto de estadísticas para el frame actual."""
+        s, i, r = self.hist[self.step_idx - 1]
+        pct = self._pct
+        return self._STATS_TEMPLATE.format(t=self.current_time, s=s, sp=s * pct,
+                                           i=i, ip=i * pct, r=r, rp=r * pct)
+    
+    # Figura y artistas compartidos entre corridas: construirlos de cero
+    # cuesta cientos de ms por cada iteración del barrido
+    _fig_cache = None
+    
+    def _build_figure(self, T_max):
+        """Crea la figura con los dos subplots o reinicia la ya existente."""
+        if SIRParticleSimulation._fig_cache is None:
+            fig = plt.figure(figsize=(16, 6))
+            ax1 = plt.subplot(121)
+            ax2 = plt.subplot(122)
+            
+            # Configurar subplot de partículas
+            ax1.set_xlim(0, self.L)
+            ax1.set_ylim(0, self.L)
+            ax1.set_aspect('equal')
+            ax1.set_xlabel('x', fontsize=12)
+            ax1.set_ylabel('y', fontsize=12)
+            ax1.set_title('Simulación de Partículas - Modelo SIR', fontsize=14, fontweight='bold')
+            
+            # Scatter plot inicial
+            scatter = ax1.scatter(self.positions[:, 0], self.positions[:, 1], 
+                                 c=self.get_colors(), s=50, alpha=0.7, edgecolors='black', linewidth=0.5)
+            
+            # Configurar subplot de curvas SIR
+            ax2.set_xlabel('Tiempo (t)', fontsize=12)
+            ax2.set_ylabel('Número de individuos', fontsize=12)
+            ax2.set_title('Evolución del Modelo SIR', fontsize=14, fontweight='bold')
+            ax2.grid(True, alpha=0.3)
+            
+            line_S, = ax2.plot([], [], 'b-', linewidth=2, label='Susceptibles (S)')
+            line_I, = ax2.plot([], [], 'r-', linewidth=2, label='Infectados (I)')
+            line_R, = ax2.plot([], [], 'g-', linewidth=2, label='Recuperados (R)')
+            ax2.legend(loc='right', fontsize=10)
+            
+            # Texto para estadísticas
+            stats_text = ax1.text(0.02, 0.98, '', transform=ax1.transAxes, 
+                                 verticalalignment='top', fontsize=10,
+                                 bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
+            SIRParticleSimulation._fig_cache = (fig, ax1, ax2, scatter,
+                                                line_S, line_I, line_R, stats_text)
+        
+        # Reiniciar los artistas con el estado de esta corrida
+        fig, ax1, ax2, scatter, line_S, line_I, line_R, stats_text = SIRParticleSimulation._fig_cache
+        scatter.set_offsets(self.positions)
+        scatter.set_color(self.rgba)
+        line_S.set_data([], [])
+        line_I.set_data([], [])
+        line_R.set_data([], [])
+        stats_text.set_text('')
+        ax2.set_xlim(0, T_max)
+        ax2.set_ylim(0, self.Ntotal)
+        return SIRParticleSimulation._fig_cache
     
-    def run_simulation(self, T_max=100, save_animation=True, filename='sir_simulation.mp4', format='mp4'):
+    def run_simulation(self, T_max=100, save_animation=True, filename='sir_simulation.mp4', format='mp4', steps_per_frame=5):
         """
         Ejecuta la simulación completa.
         
@@ -148,100 +313,50 @@ class SIRParticleSimulation:
             Nombre del archivo para guardar la animación
         format : str
             Formato de salida: 'mp4' o 'gif'
+        steps_per_frame : int
+            Pasos de simulación ejecutados por cada frame de la animación
         """
         num_steps = int(T_max / self.dt)
         
-        # Crear figura con dos subplots
-        fig = plt.figure(figsize=(16, 6))
-        ax1 = plt.subplot(121)
-        ax2 = plt.subplot(122)
-        
-        # Configurar subplot de partículas
-        ax1.set_xlim(0, self.L)
-        ax1.set_ylim(0, self.L)
-        ax1.set_aspect('equal')
-        ax1.set_xlabel('x', fontsize=12)
-        ax1.set_ylabel('y', fontsize=12)
-        ax1.set_title('Simulación de Partículas - Modelo SIR', fontsize=14, fontweight='bold')
-        
-        # Scatter plot inicial
-        scatter = ax1.scatter(self.positions[:, 0], self.positions[:, 1], 
-                             c=self.get_colors(), s=50, alpha=0.7, edgecolors='black', linewidth=0.5)
-        
-        # Configurar subplot de curvas SIR
-        ax2.set_xlim(0, T_max)
-        ax2.set_ylim(0, self.Ntotal)
-        ax2.set_xlabel('Tiempo (t)', fontsize=12)
-        ax2.set_ylabel('Número de individuos', fontsize=12)
-        ax2.set_title('Evolución del Modelo SIR', fontsize=14, fontweight='bold')
-        ax2.grid(True, alpha=0.3)
-        
-        line_S, = ax2.plot([], [], 'b-', linewidth=2, label='Susceptibles (S)')
-        line_I, = ax2.plot([], [], 'r-', linewidth=2, label='Infectados (I)')
-        line_R, = ax2.plot([], [], 'g-', linewidth=2, label='Recuperados (R)')
-        ax2.legend(loc='right', fontsize=10)
-        
-        # Texto para estadísticas
-        stats_text = ax1.text(0.02, 0.98, '', transform=ax1.transAxes, 
-                             verticalalignment='top', fontsize=10,
-                             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
+        # Crear (o reutilizar) la figura con dos subplots
+        fig, ax1, ax2, scatter, line_S, line_I, line_R, stats_text = self._build_figure(T_max)
         
         def init():
             scatter.set_offsets(self.positions)
-            scatter.set_color(self.get_colors())
+            scatter.set_color(self.rgba)
             line_S.set_data([], [])
             line_I.set_data([], [])
             line_R.set_data([], [])
             return scatter, line_S, line_I, line_R, stats_text
         
         def animate(frame):
-            # Actualizar simulación
-            self.update()
+            # Ejecutar steps_per_frame pasos de simulación por cada frame y
+            # recolorear solo las partículas que cambiaron de estado
+            for _ in range(steps_per_frame):
+                newly_infected, newly_recovered = self.update()
+                self.rgba[newly_infected] = self.color_lut[1]
+                self.rgba[newly_recovered] = self.color_lut[2]
             
             # Actualizar partículas
             scatter.set_offsets(self.positions)
-            scatter.set_color(self.get_colors())
+            scatter.set_color(self.rgba)
             
             # Actualizar curvas SIR
             line_S.set_data(self.time_history, self.S_history)
             line_I.set_data(self.time_history, self.I_history)
             line_R.set_data(self.time_history, self.R_history)
             
-            # Actualizar estadísticas
-            stats_text.set_text(f'Tiempo: {self.current_time:.1f}\n'
-                              f'S: {self.S_history[-1]} ({100*self.S_history[-1]/self.Ntotal:.1f}%)\n'
-                              f'I: {self.I_history[-1]} ({100*self.I_history[-1]/self.Ntotal:.1f}%)\n'
-                              f'R: {self.R_history[-1]} ({100*self.R_history[-1]/self.Ntotal:.1f}%)')
+            # Actualizar estadísticas (cada 10 frames: el relayout del texto
+            # es caro comparado con la física ya vectorizada)
+            if frame % 10 == 0:
+                stats_text.set_text(self._format_stats())
             
             return scatter, line_S, line_I, line_R, stats_text
         
-        # Crear animación
-        # Reducir frames para acelerar: actualizar cada 5 pasos
-        frames_to_show = num_steps // 5
+        # Crear animación (un frame cada steps_per_frame pasos)
+        frames_to_show = num_steps // steps_per_frame
         
-        def animate_fast(frame):
-            # Ejecutar 5 pasos de simulación por cada frame
-            for _ in range(5):
-                self.update()
-            
-            # Actualizar partículas
-            scatter.set_offsets(self.positions)
-            scatter.set_color(self.get_colors())
-            
-            # Actualizar curvas SIR
-            line_S.set_data(self.time_history, self.S_history)
-            line_I.set_data(self.time_history, self.I_history)
-            line_R.set_data(self.time_history, self.R_history)
-            
-            # Actualizar estadísticas
-            stats_text.set_text(f'Tiempo: {self.current_time:.1f}\n'
-                              f'S: {self.S_history[-1]} ({100*self.S_history[-1]/self.Ntotal:.1f}%)\n'
-                              f'I: {self.I_history[-1]} ({100*self.I_history[-1]/self.Ntotal:.1f}%)\n'
-                              f'R: {self.R_history[-1]} ({100*self.R_history[-1]/self.Ntotal:.1f}%)')
-            
-            return scatter, line_S, line_I, line_R, stats_text
-        
-        anim = FuncAnimation(fig, animate_fast, init_func=init, 
+        anim = FuncAnimation(fig, animate, init_func=init, 
                            frames=frames_to_show, interval=30, blit=True, repeat=False)
         
         # Guardar animación
@@ -250,7 +365,7 @@ class SIRParticleSimulation:
             
             if format.lower() == 'mp4':
                 # Usar FFMpegWriter para MP4
-                writer = FFMpegWriter(fps=20, metadata=dict(artist='SIR Simulation'), bitrate=1800)
+                writer = FFMpegWriter(fps=20, codec='libx264', metadata=dict(artist='SIR Simulation'), bitrate=1800)
                 anim.save(filename, writer=writer)
             else:
                 # Usar PillowWriter para GIF
@@ -312,6 +427,7 @@ num_steps = int(T_max / dt)
 seed_init = 12345
 
 os.makedirs("promedios1/anim", exist_ok=True)
+os.makedirs("out/mp4", exist_ok=True)
 
 print("Iniciando simulaciones (partículas) con condiciones iniciales fijas...")
 print(f"Parámetros: {params}, Nexp={Nexp}, seed_init={seed_init}")
@@ -320,60 +436,68 @@ print(f"Parámetros: {params}, Nexp={Nexp}, seed_init={seed_init}")
 rng = np.random.default_rng(seed_init)
 L, N, I0, vmax = params['L'], params['Ntotal'], params['I0'], params['vmax']
 
-positions0 = rng.uniform(0, L, (N, 2))
+positions0 = rng.uniform(0, L, (N, 2)).astype(np.float32)
 angles0 = rng.uniform(0, 2*np.pi, N)
 speeds0 = rng.uniform(0.5*vmax, vmax, N)
-velocities0 = np.column_stack([speeds0 * np.cos(angles0), speeds0 * np.sin(angles0)])
-states0 = np.zeros(N, dtype=int)
+velocities0 = np.column_stack([speeds0 * np.cos(angles0), speeds0 * np.sin(angles0)]).astype(np.float32)
+states0 = np.zeros(N, dtype=np.uint8)
 infected_idx0 = rng.choice(N, I0, replace=False)
 states0[infected_idx0] = 1
 
-def make_sim():
-    sim = SIRParticleSimulation(**params)
+def make_sim(seed=None):
+    sim = SIRParticleSimulation(**params, seed=seed)
     sim.positions = positions0.copy()
     sim.velocities = velocities0.copy()
     sim.states = states0.copy()
-    sim.infection_time = np.zeros(N)
+    sim.rgba = sim.color_lut[sim.states].copy()
+    sim.susceptible_idx = np.where(sim.states == 0)[0]
+    sim.infected_idx = np.where(sim.states == 1)[0]
+    sim.infection_time = np.zeros(N, dtype=np.float32)
     sim.infection_time[sim.states == 1] = 0.0
-    sim.time_history = [0.0]
-    sim.S_history = [np.sum(sim.states == 0)]
-    sim.I_history = [np.sum(sim.states == 1)]
-    sim.R_history = [np.sum(sim.states == 2)]
+    sim.hist[0] = np.bincount(sim.states, minlength=3)
+    sim.t_hist[0] = 0.0
+    sim.step_idx = 1
     sim.current_time = 0.0
     return sim
 
+def run_one(k):
+    """Corre la réplica k sin animación y devuelve (tiempos, historial)."""
+    sim = make_sim(seed=seed_init + 1 + k)
+    sim.run_headless(T_max=T_max)
+    return sim.t_hist[:num_steps + 1], sim.hist[:num_steps + 1]
+
+# La réplica 0 genera la animación y debe quedarse en el proceso principal
+# (Matplotlib); las demás son independientes y corren en paralelo
+sim0 = make_sim(seed=seed_init + 1)
+anim = sim0.run_simulation(T_max=T_max, save_animation=True,
+                           filename="./out/mp4/sir_particle_simulation0.mp4",
+                           format='mp4')
+results = [(sim0.t_hist[:num_steps + 1], sim0.hist[:num_steps + 1])]
+results += Parallel(n_jobs=-1)(delayed(run_one)(k) for k in range(1, Nexp))
+
 runs = []
 accS = np.zeros(num_steps + 1)
 accI = np.zeros(num_steps + 1)
 accR = np.zeros(num_steps + 1)
 
-for k in range(Nexp):
-    sim = make_sim()
-    # Ejecutar SIN guardar video (rápido)
-    steps_to_show = int(T_max / params['dt']) // 5  # no afecta la dinámica, solo la UI interna
-    # Ejecutar simulación (T_max = tiempo máximo de simulación)
-    anim = sim.run_simulation(T_max=100, save_animation=True, filename="./out/gifs/sir_particle_simulation"+str(k)+".gif", format='gif')
-
-
-    t_arr = np.array(sim.time_history[:num_steps+1])
-    s_arr = np.array(sim.S_history[:num_steps+1], dtype=float)
-    i_arr = np.array(sim.I_history[:num_steps+1], dtype=float)
-    r_arr = np.array(sim.R_history[:num_steps+1], dtype=float)
+for k, (t_hist, hist) in enumerate(results):
+    # Acumular directamente sobre las vistas ndarray del historial
+    accS += hist[:, 0]; accI += hist[:, 1]; accR += hist[:, 2]
 
     runs.append({
         "run_id": k,
-        "t": t_arr.tolist(),
-        "s": s_arr.tolist(),
-        "i": i_arr.tolist(),
-        "r": r_arr.tolist()
+        "t": t_hist,
+        # orjson exige arrays C-contiguos; las columnas de hist no lo son
+        "s": np.ascontiguousarray(hist[:, 0]),
+        "i": np.ascontiguousarray(hist[:, 1]),
+        "r": np.ascontiguousarray(hist[:, 2])
     })
-    accS += s_arr; accI += i_arr; accR += r_arr
 
 mean = {
-    "t": (np.arange(num_steps + 1) * dt).tolist(),
-    "s": (accS / Nexp).tolist(),
-    "i": (accI / Nexp).tolist(),
-    "r": (accR / Nexp).tolist()
+    "t": np.arange(num_steps + 1) * dt,
+    "s": accS / Nexp,
+    "i": accI / Nexp,
+    "r": accR / Nexp
 }
 
 payload = {
@@ -391,7 +515,8 @@ payload = {
 }
 
 os.makedirs("out", exist_ok=True)
-with open("out/sir_particles_results.json", "w", encoding="utf-8") as f:
-    json.dump(payload, f, ensure_ascii=False, indent=2)
+# orjson serializa los ndarrays directamente en C (sin pasar por listas)
+with open("out/sir_particles_results.json", "wb") as f:
+    f.write(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
 
 print("JSON guardado en out/sir_particles_results.json")
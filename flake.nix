@@ -22,11 +22,15 @@
           numpy
           matplotlib
           seaborn
+          numba
+          orjson
+          joblib
         ]);
     in {
       default = pkgs.mkShell {
         packages = [
           python
+          pkgs.ffmpeg
           pkgs.ruff
           pkgs.nodejs
           pkgs.biome